@@ -2,14 +2,17 @@
 # pylint:disable=too-many-lines
 """Tests that perform actions over RPM modular repositories."""
 import gzip
-import io
 import unittest
-from collections import defaultdict
-from types import MappingProxyType
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from functools import partial
+from itertools import count
 from urllib.parse import urljoin
 from xml.etree import ElementTree
 
 import pytest
+import requests
 from jsonschema import validate
 from packaging.version import Version
 
@@ -40,7 +43,6 @@ from pulp_2_tests.constants import (
     MODULE_FIXTURES_ERRATA,
     MODULE_FIXTURES_PACKAGES,
     MODULE_FIXTURES_PACKAGE_STREAM,
-    RPM_DATA,
     RPM_MODULAR_OLD_VERSION_URL,
     RPM_NAMESPACES,
     RPM_UNSIGNED_FEED_COUNT,
@@ -68,36 +70,76 @@ from pulp_2_tests.tests.rpm.utils import (
 
 pytestmark = pytest.mark.recursive_conservative  # pylint:disable=invalid-name
 
+_MODULES_DATA_XPATH = "{{{}}}data[@type='modules']".format(
+    RPM_NAMESPACES['metadata/repo']
+)
+
+_REPOMD_DATA_TAG = '{{{}}}data'.format(RPM_NAMESPACES['metadata/repo'])
+
+_REPOMD_LOCATION_TAG = '{{{}}}location'.format(RPM_NAMESPACES['metadata/repo'])
+
+_MODULAR_RPM_COUNT = sum(MODULE_FIXTURES_PACKAGES.values())
 
-# MappingProxyType is used to make an immutable dict.
-MODULES_METADATA = MappingProxyType({
-    'name': MODULE_ERRATA_RPM_DATA['rpm_name'],
-    'stream': MODULE_ERRATA_RPM_DATA['stream_name'],
-    'version': MODULE_ERRATA_RPM_DATA['version'],
-    'context': MODULE_ERRATA_RPM_DATA['context'],
-    'arch': MODULE_ERRATA_RPM_DATA['arch'],
-})
+_FIXTURES_SESSION = requests.Session()
+
+
+ModuleMetadata = namedtuple(
+    'ModuleMetadata',
+    ('name', 'stream', 'version', 'context', 'arch'),
+)
+"""The fields identifying a Module in a consumer profile."""
+
+MODULES_METADATA = ModuleMetadata(
+    name=MODULE_ERRATA_RPM_DATA['rpm_name'],
+    stream=MODULE_ERRATA_RPM_DATA['stream_name'],
+    version=MODULE_ERRATA_RPM_DATA['version'],
+    context=MODULE_ERRATA_RPM_DATA['context'],
+    arch=MODULE_ERRATA_RPM_DATA['arch'],
+)
 """Metadata for a Module."""
 
-MODULES_METADATA_2 = MappingProxyType({
-    'name': MODULE_DATA_2['name'],
-    'stream': MODULE_DATA_2['stream'],
-    'version': MODULE_DATA_2['version'],
-    'context': MODULE_DATA_2['context'],
-    'arch': MODULE_DATA_2['arch'],
-})
+MODULES_METADATA_2 = ModuleMetadata(
+    name=MODULE_DATA_2['name'],
+    stream=MODULE_DATA_2['stream'],
+    version=MODULE_DATA_2['version'],
+    context=MODULE_DATA_2['context'],
+    arch=MODULE_DATA_2['arch'],
+)
 """Metadata for another Module."""
 
-# MappingProxyType is used to make an immutable dict.
-RPM_WITH_ERRATUM_METADATA = MappingProxyType({
-    'name': RPM_DATA['name'],
-    'epoch': RPM_DATA['epoch'],
-    'version': RPM_DATA['version'],
-    'release': int(RPM_DATA['release']),
-    'arch': RPM_DATA['arch'],
-    'vendor': RPM_DATA['metadata']['vendor'],
-})
-"""Metadata for an RPM with an associated erratum."""
+_MODULAR_ERRATUM = {
+    'status': 'stable',
+    'updated': MODULE_ERRATA_RPM_DATA['updated'],
+    'rights': None,
+    'from': MODULE_ERRATA_RPM_DATA['from'],
+    'description': MODULE_ERRATA_RPM_DATA['description'],
+    'title': MODULE_ERRATA_RPM_DATA['rpm_name'],
+    'issued': MODULE_ERRATA_RPM_DATA['issued'],
+    'relogin_suggested': False,
+    'restart_suggested': False,
+    'solution': None,
+    'summary': None,
+    'pushcount': '1',
+    'version': '1',
+    'references': [],
+    'release': '1',
+    'reboot_suggested': None,
+    'type': 'enhancement',
+    'severity': None,
+    'pkglist': [{
+        'name': MODULE_ERRATA_RPM_DATA['collection_name'],
+        'short': '0',
+        'module': {
+            'name': MODULE_ERRATA_RPM_DATA['rpm_name'],
+            'stream': MODULE_ERRATA_RPM_DATA['stream_name'],
+            'version': MODULE_ERRATA_RPM_DATA['version'],
+            'arch': MODULE_ERRATA_RPM_DATA['arch'],
+            'context': MODULE_ERRATA_RPM_DATA['context']
+        },
+        'packages': []
+    }]
+}
+"""A modular erratum. Copy it and give the copy a unique ``id``."""
 
 CONTENT_APPLICABILITY_REPORT_SCHEMA = {
     '$schema': 'http://json-schema.org/schema#',
@@ -143,6 +185,35 @@ Schema now includes modulemd profiles:
 """
 
 
+def _sync_and_create_target(test_case, source, get_old_rpm=None):
+    """Sync ``source`` while a target repository is created.
+
+    The target repository is deleted when ``test_case`` is cleaned up. If
+    ``get_old_rpm`` is given, it is called while the sync runs, and the RPM
+    it returns is uploaded into the target repository once the sync has
+    finished. That RPM is also offered by the source repository's feed, so
+    importing it during the sync would race with the sync.
+
+    :param test_case: A test case with ``cfg`` and ``client`` attributes.
+    :param source: A dict of information about the repository to sync.
+    :param get_old_rpm: A callable returning the bytes of an RPM, or ``None``.
+    :returns: A dict of information about the target repository.
+    """
+    cfg = test_case.cfg
+    client = test_case.client
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        sync = executor.submit(sync_repo, cfg, source)
+        target = client.post(REPOSITORY_PATH, gen_repo())
+        test_case.addCleanup(client.delete, target['_href'])
+        rpm = get_old_rpm() if get_old_rpm is not None else None
+        sync.result()
+    if rpm is not None:
+        upload_import_unit(cfg, rpm, {'unit_type_id': 'rpm'}, target)
+        units = search_units(cfg, target, {'type_ids': ['rpm']})
+        test_case.assertEqual(len(units), 1, units)
+    return target
+
+
 class CheckIsModularFlagAfterSyncTestCase(unittest.TestCase):
     """Check is_modular flag unit is present after syncing."""
 
@@ -191,13 +262,13 @@ class CheckIsModularFlagAfterSyncTestCase(unittest.TestCase):
         # Check the number of modular units returned by `is_modular` as True.
         self.assertEqual(
             len(modular_units),
-            sum(MODULE_FIXTURES_PACKAGES.values()),
+            _MODULAR_RPM_COUNT,
             modular_units
         )
         # Check the number of modular units returned by `is_modular` as False.
         self.assertEqual(
             len(non_modular_units),
-            RPM_UNSIGNED_FEED_COUNT - sum(MODULE_FIXTURES_PACKAGES.values()),
+            RPM_UNSIGNED_FEED_COUNT - _MODULAR_RPM_COUNT,
             non_modular_units
         )
 
@@ -272,6 +343,7 @@ class CheckModulesYamlTestCase(unittest.TestCase):
         if cls.cfg.pulp_version < Version('2.18.1'):
             raise unittest.SkipTest('This test requires Pulp 2.18.1 or newer.')
         cls.client = api.Client(cls.cfg, api.json_handler)
+        cls.cli_client = cli.Client(cls.cfg)
 
     def test_no_modules_yaml_generated_non_modular(self):
         """Verify no ``modules.yaml`` is generated for non modular content.
@@ -297,7 +369,7 @@ class CheckModulesYamlTestCase(unittest.TestCase):
         sync_repo(self.cfg, repo)
         repo = self.client.get(repo['_href'], params={'details': True})
         # Step 3
-        files = self.list_repo_data_files(self.cfg, repo)
+        files = self.list_repo_data_files(repo)
         # check no modules.yaml.gz is found
         self.assertFalse(bool(files))
         modules_elements = self.get_modules_elements_repomd(
@@ -328,16 +400,15 @@ class CheckModulesYamlTestCase(unittest.TestCase):
         self.addCleanup(self.client.delete, repo['_href'])
         sync_repo(self.cfg, repo)
         repo = self.client.get(repo['_href'], params={'details': True})
-        module_file = self.list_repo_data_files(self.cfg, repo)[0]
-        sha_vals = self.get_sha1_vals_file(self.cfg, module_file)
+        module_file = self.list_repo_data_files(repo)[0]
+        sha_vals = self.get_sha1_vals_file(module_file)
         # sha_vals[0] contains the sha1 checksum of the file
         # sha_vals[1] contains the filepath containing the checked file
         self.assertIn(sha_vals[0], sha_vals[1])
 
-    @staticmethod
-    def list_repo_data_files(cfg, repo):
+    def list_repo_data_files(self, repo):
         """Return a list of all the files present inside repodata dir."""
-        return cli.Client(cfg).run((
+        return self.cli_client.run((
             'find',
             '/var/lib/pulp/published/yum/master/yum_distributor/{}/'.format(
                 repo['id']
@@ -352,18 +423,11 @@ class CheckModulesYamlTestCase(unittest.TestCase):
     def get_modules_elements_repomd(cfg, distributor):
         """Return a list of elements present inside the repomd.xml."""
         repomd_xml = get_repodata_repomd_xml(cfg, distributor)
-        xpath = (
-            "{{{namespace}}}data[@type='{type_}']".format(
-                namespace=RPM_NAMESPACES['metadata/repo'],
-                type_='modules'
-            )
-        )
-        return repomd_xml.findall(xpath)
+        return repomd_xml.findall(_MODULES_DATA_XPATH)
 
-    @staticmethod
-    def get_sha1_vals_file(cfg, filepath):
+    def get_sha1_vals_file(self, filepath):
         """Return a list containing sha1 checksum of the file and filepath."""
-        return cli.Client(cfg).run((
+        return self.cli_client.run((
             'sha1sum',
             filepath
         ), sudo=True).stdout.split()
@@ -385,6 +449,9 @@ class CopyModularDefaultsTestCase(unittest.TestCase):
     Exercise the use of ``recursive and ``recursive_conservative``.
     """
 
+    CRITERIA = {'filters': {}, 'type_ids': ['modulemd_defaults']}
+    """The criteria used to copy every ``modulemd_defaults`` unit."""
+
     @classmethod
     def setUpClass(cls):
         """Create class wide variables."""
@@ -431,10 +498,6 @@ class CopyModularDefaultsTestCase(unittest.TestCase):
 
     def copy_units(self, recursive, recursive_conservative, old_dependency=False):
         """Create two repositories and copy content between them."""
-        criteria = {
-            'filters': {},
-            'type_ids': ['modulemd_defaults'],
-        }
         repos = []
         body = gen_repo(
             importer_config={'feed': RPM_WITH_MODULES_FEED_URL},
@@ -442,19 +505,11 @@ class CopyModularDefaultsTestCase(unittest.TestCase):
         )
         repos.append(self.client.post(REPOSITORY_PATH, body))
         self.addCleanup(self.client.delete, repos[0]['_href'])
-        sync_repo(self.cfg, repos[0])
-        repos.append(self.client.post(REPOSITORY_PATH, gen_repo()))
-        self.addCleanup(self.client.delete, repos[1]['_href'])
         # Add `old_dependency` for OLD RPM on B
+        get_old_rpm = None
         if old_dependency:
-            rpm = utils.http_get(RPM_WITH_OLD_VERSION_URL)
-            upload_import_unit(
-                self.cfg,
-                rpm,
-                {'unit_type_id': 'rpm'}, repos[1]
-            )
-            units = search_units(self.cfg, repos[1], {'type_ids': ['rpm']})
-            self.assertEqual(len(units), 1, units)
+            get_old_rpm = partial(utils.http_get, RPM_WITH_OLD_VERSION_URL)
+        repos.append(_sync_and_create_target(self, repos[0], get_old_rpm))
 
         self.client.post(urljoin(repos[1]['_href'], 'actions/associate/'), {
             'source_repo_id': repos[0]['id'],
@@ -462,7 +517,7 @@ class CopyModularDefaultsTestCase(unittest.TestCase):
                 'recursive': recursive,
                 'recursive_conservative': recursive_conservative,
             },
-            'criteria': criteria
+            'criteria': self.CRITERIA
         })
         return self.client.get(repos[1]['_href'], params={'details': True})
 
@@ -544,6 +599,16 @@ class CopyModulesTestCase(unittest.TestCase):
             cls.COPY_MODULES_LIST.append(MODULE_FIXTURES_DUCK_4_STREAM)
             cls.COPY_MODULES_LIST.append(MODULE_FIXTURES_DUCK_5_STREAM)
             cls.COPY_MODULES_LIST.append(MODULE_FIXTURES_DUCK_6_STREAM)
+        cls.criteria = {
+            (module['name'], module['stream']): {
+                'filters': {'unit': {
+                    'name': module['name'],
+                    'stream': module['stream']
+                }},
+                'type_ids': ['modulemd'],
+            }
+            for module in cls.COPY_MODULES_LIST
+        }
 
     def test_copy_modulemd_recursive_nonconservative_no_old_rpm(self):
         """Test modular copy using override_config and no old RPMs."""
@@ -601,13 +666,7 @@ class CopyModulesTestCase(unittest.TestCase):
 
     def copy_units(self, recursive, recursive_conservative, old_rpm, module):
         """Create two repositories and copy content between them."""
-        criteria = {
-            'filters': {'unit': {
-                'name': module['name'],
-                'stream': module['stream']
-            }},
-            'type_ids': ['modulemd'],
-        }
+        criteria = self.criteria[module['name'], module['stream']]
         repos = []
         body = gen_repo(
             importer_config={'feed': module['feed']},
@@ -615,23 +674,9 @@ class CopyModulesTestCase(unittest.TestCase):
         )
         repos.append(self.client.post(REPOSITORY_PATH, body))
         self.addCleanup(self.client.delete, repos[0]['_href'])
-        sync_repo(self.cfg, repos[0])
-        repos.append(self.client.post(REPOSITORY_PATH, gen_repo()))
-        self.addCleanup(self.client.delete, repos[1]['_href'])
         # Add `old_rpm` for OLD RPM on B
-        if old_rpm:
-            rpm = utils.http_get(module['old'])
-            upload_import_unit(
-                self.cfg, rpm,
-                {'unit_type_id': 'rpm'},
-                repos[1]
-            )
-            units = search_units(
-                self.cfg,
-                repos[1],
-                {'type_ids': ['rpm']}
-            )
-            self.assertEqual(len(units), 1, units)
+        get_old_rpm = partial(utils.http_get, module['old']) if old_rpm else None
+        repos.append(_sync_and_create_target(self, repos[0], get_old_rpm))
 
         self.client.post(urljoin(repos[1]['_href'], 'actions/associate/'), {
             'source_repo_id': repos[0]['id'],
@@ -826,6 +871,11 @@ class ManageModularErrataTestCase(unittest.TestCase):
         if check_issue_4405(cls.cfg):
             raise unittest.SkipTest('https://pulp.plan.io/issues/4405')
         cls.client = api.Client(cls.cfg, api.json_handler)
+        # The update info from the fixtures repo. It is only read.
+        cls.update_info_fixtures = get_xml_content_from_fixture(
+            fixture_path=RPM_WITH_MODULES_FEED_URL,
+            data_type='updateinfo',
+        )
 
     def test_sync_publish_update_info(self):
         """Test sync,publish of Modular RPM repo and checks the update info.
@@ -843,15 +893,9 @@ class ManageModularErrataTestCase(unittest.TestCase):
         5. Compare this against the ``update_info.xml`` in the fixtures repo.
         """
         _, update_list = self._set_repo_and_get_repo_data()
-
-        # getting the update info from the fixtures repo
-        update_info_fixtures = get_xml_content_from_fixture(
-            fixture_path=RPM_WITH_MODULES_FEED_URL,
-            data_type='updateinfo',
-        )
         self.assertEqual(
             self._get_errata_rpm_mapping(update_list),
-            self._get_errata_rpm_mapping(update_info_fixtures),
+            self._get_errata_rpm_mapping(self.update_info_fixtures),
             'mismatch in the module packages.'
         )
 
@@ -876,8 +920,8 @@ class ManageModularErrataTestCase(unittest.TestCase):
         ``<repo-id>_<index>_<module-name>``.  The module name is ``default``
         and the index is 0 for ursine RPMs.
 
-        The set is created using set-comprehension and x-path. After creating
-        the set, it appears as in the example below.
+        The set is created in a single pass over the fixture updates. After
+        creating the set, it appears as in the example below.
 
         .. code:: python
 
@@ -892,38 +936,29 @@ class ManageModularErrataTestCase(unittest.TestCase):
         """
         repo, update_list = self._set_repo_and_get_repo_data()
 
-        # getting the updateinfo from the fixtures repo
-        update_info_fixtures = get_xml_content_from_fixture(
-            fixture_path=RPM_WITH_MODULES_FEED_URL,
-            data_type='updateinfo',
-        )
-
         # Errata ID to collection name map in updateinfo of published repo.
         collection_update_list = {
-            update.find('./id').text:
-            update.find('.//collection').attrib['short']
-            for update in update_list.findall('update')
-        }
-
-        collections_from_fixtures = {
-            update.find('id').text:
-            'default' if update.find('.//module') is None
-            else update.find('.//module').attrib['name']
-            for update in
-            update_info_fixtures.findall('.//update')
+            update.findtext('id'):
+            update.find('pkglist/collection').attrib['short']
+            for update in update_list.iterfind('update')
         }
 
         # indexes is used to increase the index of the module in the
         # collections
-        indexes = defaultdict(lambda: 1)
-        for key, val in tuple(collections_from_fixtures.items()):
-            if val in indexes:
-                indexes[val] += 1
-            collections_from_fixtures[key] = (
-                '{}_0_default'.format(repo['id'])
-                if val == 'default'
-                else '{}_{}_{}'.format(repo['id'], indexes[val], val)
-            )
+        indexes = defaultdict(lambda: count(1))
+        collections_from_fixtures = {}
+        for update in self.update_info_fixtures.iterfind('update'):
+            module = update.find('pkglist/collection/module')
+            if module is None:
+                collection = '{}_0_default'.format(repo['id'])
+            else:
+                name = module.attrib['name']
+                collection = '{}_{}_{}'.format(
+                    repo['id'],
+                    next(indexes[name]),
+                    name
+                )
+            collections_from_fixtures[update.findtext('id')] = collection
 
         self.assertEqual(
             collections_from_fixtures,
@@ -964,14 +999,16 @@ class ManageModularErrataTestCase(unittest.TestCase):
             'updateinfo'
         )
         modules = [
-            dict(module.items())
+            dict(module.attrib)
             for module
-            in update_info_file.findall('.//module')
+            in update_info_file.iterfind('.//module')
         ]
         self.assertEqual(len(modules), RPM_WITH_MODULES_FEED_COUNT, modules)
-        expected_fields = {'stream', 'version', 'arch', 'context', 'name'}
+        expected_fields = frozenset(
+            ('stream', 'version', 'arch', 'context', 'name')
+        )
         self.assertTrue(
-            all([expected_fields == set(module.keys()) for module in modules]),
+            all(module.keys() == expected_fields for module in modules),
             modules
         )
         # Step 3
@@ -981,13 +1018,7 @@ class ManageModularErrataTestCase(unittest.TestCase):
             {'filters': {'unit': {'is_modular': True}}, 'type_ids': ['rpm']}
         )
         self.assertTrue(
-            all(
-                [
-                    module
-                    for module in modular_units
-                    if module['repo_id'] == repo['id']
-                ]
-            ),
+            all(module['repo_id'] == repo['id'] for module in modular_units),
             modular_units
         )
         # Step 4
@@ -1000,13 +1031,7 @@ class ManageModularErrataTestCase(unittest.TestCase):
             }
         )
         self.assertTrue(
-            all(
-                [
-                    erratum
-                    for erratum in erratum_units
-                    if erratum['repo_id'] == repo['id']
-                ]
-            ),
+            all(erratum['repo_id'] == repo['id'] for erratum in erratum_units),
             erratum_units
         )
 
@@ -1063,19 +1088,21 @@ class ManageModularErrataTestCase(unittest.TestCase):
 
         # errata_upload - get the errata is uploaded in step 2
         # from the updateinfo.xml.
-        errata_upload = [
+        errata_upload = next((
             update
-            for update in update_info_file.findall('update')
-            if update.find('id').text == unit['id']
-        ]
+            for update in update_info_file.iterfind('update')
+            if update.findtext('id') == unit['id']
+        ), None)
 
         self.assertEqual(
             repo_initial['content_unit_counts']['erratum'] + 1,
             repo['content_unit_counts']['erratum'],
             'Erratum count mismatch after uploading.'
         )
-        self.assertGreater(len(errata_upload), 0)
-        self.assertIsNotNone(errata_upload[0].find('.//module'))
+        self.assertIsNotNone(errata_upload)
+        self.assertIsNotNone(
+            errata_upload.find('pkglist/collection/module')
+        )
 
     def _set_repo_and_get_repo_data(self):
         """Create and Publish the required repo for this class.
@@ -1106,49 +1133,23 @@ class ManageModularErrataTestCase(unittest.TestCase):
 
     @staticmethod
     def _get_errata_rpm_mapping(xml):
-        mapper = {}
-        for update in xml.findall('update'):
-            mapper[update.find('id').text] = [
-                package.text for package in update.findall('.//filename')
+        """Map the ID of each erratum to the filenames of its packages.
+
+        If several errata share an ID, the last one wins.
+        """
+        return {
+            update.find('id').text: [
+                package.text for package in update.iter('filename')
             ]
-        return mapper
+            for update in xml.iterfind('update')
+        }
 
     @staticmethod
     def _gen_modular_errata():
         """Generate and return a modular erratum with a unique ID."""
-        return {
-            'id': utils.uuid4(),
-            'status': 'stable',
-            'updated': MODULE_ERRATA_RPM_DATA['updated'],
-            'rights': None,
-            'from': MODULE_ERRATA_RPM_DATA['from'],
-            'description': MODULE_ERRATA_RPM_DATA['description'],
-            'title': MODULE_ERRATA_RPM_DATA['rpm_name'],
-            'issued': MODULE_ERRATA_RPM_DATA['issued'],
-            'relogin_suggested': False,
-            'restart_suggested': False,
-            'solution': None,
-            'summary': None,
-            'pushcount': '1',
-            'version': '1',
-            'references': [],
-            'release': '1',
-            'reboot_suggested': None,
-            'type': 'enhancement',
-            'severity': None,
-            'pkglist': [{
-                'name': MODULE_ERRATA_RPM_DATA['collection_name'],
-                'short': '0',
-                'module': {
-                    'name': MODULE_ERRATA_RPM_DATA['rpm_name'],
-                    'stream': MODULE_ERRATA_RPM_DATA['stream_name'],
-                    'version': MODULE_ERRATA_RPM_DATA['version'],
-                    'arch': MODULE_ERRATA_RPM_DATA['arch'],
-                    'context': MODULE_ERRATA_RPM_DATA['context']
-                },
-                'packages': []
-            }]
-        }
+        erratum = deepcopy(_MODULAR_ERRATUM)
+        erratum['id'] = utils.uuid4()
+        return erratum
 
 
 class ModularApplicabilityTestCase(unittest.TestCase):
@@ -1174,11 +1175,30 @@ class ModularApplicabilityTestCase(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        """Create class-wide variables."""
+        """Create class-wide variables, and create and sync a modular repo.
+
+        Tests that don't add an erratum bind their consumers to this
+        repository.
+        """
         cls.cfg = config.get_config()
         if cls.cfg.pulp_version < Version('2.18'):
             raise unittest.SkipTest('This test requires Pulp 2.18 or newer.')
         cls.client = api.Client(cls.cfg, api.json_handler)
+        cls.repo = cls.client.post(REPOSITORY_PATH, cls.gen_modular_repo())
+        try:
+            sync_repo(cls.cfg, cls.repo)
+            cls.repo = cls.client.get(
+                cls.repo['_href'],
+                params={'details': True}
+            )
+        except:  # noqa:E722
+            cls.tearDownClass()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        """Delete the repository created by :meth:`setUpClass`."""
+        cls.client.delete(cls.repo['_href'])
 
     def test_modular_rpm(self):
         """Verify content is made available if appropriate.
@@ -1191,9 +1211,11 @@ class ModularApplicabilityTestCase(unittest.TestCase):
         3. Verify the content is applicable.
         """
         # Reduce the versions to check whether newer version applies.
-        rpm_with_modules_metadata = MODULE_ARTIFACT_RPM_DATA.copy()
-        rpm_with_modules_metadata['version'] = '5'
-        modules_metadata = MODULES_METADATA.copy()
+        rpm_with_modules_metadata = {
+            **MODULE_ARTIFACT_RPM_DATA,
+            'version': '5',
+        }
+        modules_metadata = MODULES_METADATA._asdict()
         applicability = self.do_test(
             [modules_metadata],
             [rpm_with_modules_metadata]
@@ -1212,9 +1234,11 @@ class ModularApplicabilityTestCase(unittest.TestCase):
         Do the same as :meth:`test_modular_rpm`, except that the version should
         be higher than what is offered by the module.
         """
-        rpm_with_modules_metadata = MODULE_ARTIFACT_RPM_DATA.copy()
-        rpm_with_modules_metadata['version'] = '7'
-        modules_metadata = MODULES_METADATA.copy()
+        rpm_with_modules_metadata = {
+            **MODULE_ARTIFACT_RPM_DATA,
+            'version': '7',
+        }
+        modules_metadata = MODULES_METADATA._asdict()
         applicability = self.do_test(
             [modules_metadata],
             [rpm_with_modules_metadata],
@@ -1238,11 +1262,11 @@ class ModularApplicabilityTestCase(unittest.TestCase):
         3. Verify the content is applicable.
         """
         # Reduce the versions to check whether newer version applies.
-        rpm_with_modules_metadata = MODULE_ARTIFACT_RPM_DATA.copy()
-        rpm_with_modules_metadata['version'] = '5'
-        modules_metadata = MODULES_METADATA.copy()
-        rpm_with_erratum_metadata = RPM_WITH_ERRATUM_METADATA.copy()
-        rpm_with_erratum_metadata['version'] = '4.0'
+        rpm_with_modules_metadata = {
+            **MODULE_ARTIFACT_RPM_DATA,
+            'version': '5',
+        }
+        modules_metadata = MODULES_METADATA._asdict()
         applicability = self.do_test(
             [modules_metadata],
             [rpm_with_modules_metadata, rpm_with_modules_metadata]
@@ -1271,14 +1295,14 @@ class ModularApplicabilityTestCase(unittest.TestCase):
         3. Verify that the content is made available for the consumer.
         """
         # Reduce the versions to check whether newer version applies.
-        rpm_with_modules_metadata = MODULE_ARTIFACT_RPM_DATA.copy()
-        rpm_with_modules_metadata['version'] = '5'
-
-        rpm_with_modules_metadata_2 = MODULE_ARTIFACT_RPM_DATA_2.copy()
-        rpm_with_modules_metadata['version'] = '0.5'
+        rpm_with_modules_metadata = {
+            **MODULE_ARTIFACT_RPM_DATA,
+            'version': '0.5',
+        }
+        rpm_with_modules_metadata_2 = dict(MODULE_ARTIFACT_RPM_DATA_2)
 
-        modules_metadata = MODULES_METADATA.copy()
-        modules_metadata_2 = MODULES_METADATA_2.copy()
+        modules_metadata = MODULES_METADATA._asdict()
+        modules_metadata_2 = MODULES_METADATA_2._asdict()
         applicability = self.do_test(
             [modules_metadata, modules_metadata_2],
             [rpm_with_modules_metadata, rpm_with_modules_metadata_2]
@@ -1300,9 +1324,11 @@ class ModularApplicabilityTestCase(unittest.TestCase):
         2. Verify the content is applicable.
         """
         # Reduce the versions to check whether newer version applies.
-        rpm_with_modules_metadata = MODULE_ARTIFACT_RPM_DATA.copy()
-        rpm_with_modules_metadata['version'] = '5'
-        modules_metadata = MODULES_METADATA.copy()
+        rpm_with_modules_metadata = {
+            **MODULE_ARTIFACT_RPM_DATA,
+            'version': '5',
+        }
+        modules_metadata = MODULES_METADATA._asdict()
         erratum = self.gen_modular_errata()
         applicability = self.do_test(
             [modules_metadata],
@@ -1322,7 +1348,9 @@ class ModularApplicabilityTestCase(unittest.TestCase):
 
         This method does the following:
 
-        1. Create a modular repo.
+        1. Pick a modular repo. The class-wide one is used, unless an
+           erratum is given: then a new repo is created and the erratum is
+           added to it.
         2. Create a consumer and bind them to the modular repo.
         3. Create consumer profiles for the passed modules and rpms.
         4. Regenerate and return the fetched applicability.
@@ -1333,39 +1361,39 @@ class ModularApplicabilityTestCase(unittest.TestCase):
 
         :returns: A dict containing the consumer ``applicability``.
         """
-        body = gen_repo(
-            importer_config={'feed': RPM_WITH_MODULES_FEED_URL},
-            distributors=[gen_distributor(auto_publish=True)]
-        )
-        repo = self.client.post(REPOSITORY_PATH, body)
-        sync_repo(self.cfg, repo)
-        repo = self.client.get(repo['_href'], params={'details': True})
-        if erratum is not None:
+        if erratum is None:
+            repo = self.repo
+        else:
+            repo = self.client.post(REPOSITORY_PATH, self.gen_modular_repo())
+            self.addCleanup(self.client.delete, repo['_href'])
+            sync_repo(self.cfg, repo)
+            repo = self.client.get(repo['_href'], params={'details': True})
             upload_import_erratum(self.cfg, erratum, repo)
-        self.addCleanup(self.client.delete, repo['_href'])
 
         # Create a consumer.
         consumer = self.client.post(CONSUMERS_PATH, gen_consumer())
-        self.addCleanup(self.client.delete, consumer['consumer']['_href'])
+        consumer_href = consumer['consumer']['_href']
+        self.addCleanup(self.client.delete, consumer_href)
 
         # Bind the consumer.
-        self.client.post(urljoin(consumer['consumer']['_href'], 'bindings/'), {
+        self.client.post(urljoin(consumer_href, 'bindings/'), {
             'distributor_id': repo['distributors'][0]['id'],
             'notify_agent': False,
             'repo_id': repo['id'],
         })
 
         # Create a consumer profile with RPM
+        profiles_path = urljoin(consumer_href, 'profiles/')
         if rpm_profile:
             self.client.post(
-                urljoin(consumer['consumer']['_href'], 'profiles/'),
+                profiles_path,
                 {'content_type': 'rpm', 'profile': rpm_profile}
             )
 
         # Create a consumer profile with modules.
         if modules_profile:
             self.client.post(
-                urljoin(consumer['consumer']['_href'], 'profiles/'),
+                profiles_path,
                 {'content_type': 'modulemd', 'profile': modules_profile}
             )
 
@@ -1385,50 +1413,27 @@ class ModularApplicabilityTestCase(unittest.TestCase):
             },
         })
 
+    @staticmethod
+    def gen_modular_repo():
+        """Return a body for creating a repo that syncs modular content."""
+        return gen_repo(
+            importer_config={'feed': RPM_WITH_MODULES_FEED_URL},
+            distributors=[gen_distributor(auto_publish=True)]
+        )
+
     @staticmethod
     def gen_modular_errata():
         """Generate and return a modular erratum with RPM."""
-        return {
-            'id': utils.uuid4(),
-            'status': 'stable',
-            'updated': MODULE_ERRATA_RPM_DATA['updated'],
-            'rights': None,
-            'from': MODULE_ERRATA_RPM_DATA['from'],
-            'description': MODULE_ERRATA_RPM_DATA['description'],
-            'title': MODULE_ERRATA_RPM_DATA['rpm_name'],
-            'issued': MODULE_ERRATA_RPM_DATA['issued'],
-            'relogin_suggested': False,
-            'restart_suggested': False,
-            'solution': None,
-            'summary': None,
-            'pushcount': '1',
-            'version': '1',
-            'references': [],
-            'release': '1',
-            'reboot_suggested': None,
-            'type': 'enhancement',
-            'severity': None,
-            'pkglist': [{
-                'name': MODULE_ERRATA_RPM_DATA['collection_name'],
-                'short': '0',
-                'module': {
-                    'name': MODULE_ERRATA_RPM_DATA['rpm_name'],
-                    'stream': MODULE_ERRATA_RPM_DATA['stream_name'],
-                    'version': MODULE_ERRATA_RPM_DATA['version'],
-                    'arch': MODULE_ERRATA_RPM_DATA['arch'],
-                    'context': MODULE_ERRATA_RPM_DATA['context']
-                },
-                'packages': [
-                    {
-                        'arch': MODULE_ARTIFACT_RPM_DATA['arch'],
-                        'name': MODULE_ARTIFACT_RPM_DATA['name'],
-                        'release': MODULE_ARTIFACT_RPM_DATA['release'],
-                        'version': MODULE_ARTIFACT_RPM_DATA['version'],
-                        'src': MODULE_ARTIFACT_RPM_DATA['src']
-                    }
-                ]
-            }]
-        }
+        erratum = deepcopy(_MODULAR_ERRATUM)
+        erratum['id'] = utils.uuid4()
+        erratum['pkglist'][0]['packages'].append({
+            'arch': MODULE_ARTIFACT_RPM_DATA['arch'],
+            'name': MODULE_ARTIFACT_RPM_DATA['name'],
+            'release': MODULE_ARTIFACT_RPM_DATA['release'],
+            'version': MODULE_ARTIFACT_RPM_DATA['version'],
+            'src': MODULE_ARTIFACT_RPM_DATA['src']
+        })
+        return erratum
 
 
 class ModularErrataCopyTestCase(unittest.TestCase):
@@ -1458,6 +1463,7 @@ class ModularErrataCopyTestCase(unittest.TestCase):
         if cls.cfg.pulp_version < Version('2.19'):
             raise unittest.SkipTest('This test requires Pulp 2.19 or newer.')
         cls.client = api.Client(cls.cfg, api.json_handler)
+        cls.old_rpm = None
 
     def test_recursive_noconservative_nodependency(self):
         """Recursive, non-conservative, and no old dependency."""
@@ -1486,11 +1492,13 @@ class ModularErrataCopyTestCase(unittest.TestCase):
 
     def make_assertions_dependency(self, repo):
         """Make assertions over a repo with an older version of RPM present."""
-        versions = sorted([
+        versions = sorted(
             unit['metadata']['version']
-            for unit in search_units(self.cfg, repo, {'type_ids': ['rpm']})
-            if unit['metadata']['name'] == 'duck'
-        ])
+            for unit in search_units(self.cfg, repo, {
+                'filters': {'unit': {'name': 'duck'}},
+                'type_ids': ['rpm'],
+            })
+        )
 
         # 2 due to the older version already present on the repository.
         self.assertEqual(len(versions), 2, versions)
@@ -1561,6 +1569,17 @@ class ModularErrataCopyTestCase(unittest.TestCase):
             repo
         )
 
+    @classmethod
+    def get_old_rpm(cls):
+        """Return the older version of the modular RPM.
+
+        The RPM is downloaded the first time it is needed, and reused by the
+        other tests of this class.
+        """
+        if cls.old_rpm is None:
+            cls.old_rpm = utils.http_get(RPM_MODULAR_OLD_VERSION_URL)
+        return cls.old_rpm
+
     def copy_modular_errata(
             self, recursive, recursive_conservative, old_dependency=False
     ):
@@ -1572,23 +1591,16 @@ class ModularErrataCopyTestCase(unittest.TestCase):
         )
         repos.append(self.client.post(REPOSITORY_PATH, body))
         self.addCleanup(self.client.delete, repos[0]['_href'])
-        sync_repo(self.cfg, repos[0])
-        repos.append(self.client.post(REPOSITORY_PATH, gen_repo()))
-        self.addCleanup(self.client.delete, repos[1]['_href'])
+        repos.append(_sync_and_create_target(
+            self,
+            repos[0],
+            self.get_old_rpm if old_dependency else None
+        ))
 
         override_config = {
             'recursive': recursive,
             'recursive_conservative': recursive_conservative
         }
-        if old_dependency:
-            rpm = utils.http_get(RPM_MODULAR_OLD_VERSION_URL)
-            upload_import_unit(
-                self.cfg,
-                rpm,
-                {'unit_type_id': 'rpm'}, repos[1]
-            )
-            units = search_units(self.cfg, repos[1], {'type_ids': ['rpm']})
-            self.assertEqual(len(units), 1, units)
 
         self.client.post(urljoin(repos[1]['_href'], 'actions/associate/'), {
             'source_repo_id': repos[0]['id'],
@@ -1628,13 +1640,12 @@ class PackageManagerModuleListTestCase(unittest.TestCase):
         repo = client.get(repo['_href'], params={'details': True})
         sync_repo(cfg, repo)
         publish_repo(cfg, repo)
-        repo = client.get(repo['_href'], params={'details': True})
         repo_path = gen_yum_config_file(
             cfg,
-            baseurl=urljoin(cfg.get_base_url(), urljoin(
-                'pulp/repos/',
-                repo['distributors'][0]['config']['relative_url']
-            )),
+            baseurl=urljoin(
+                cfg.get_base_url(),
+                'pulp/repos/' + repo['distributors'][0]['config']['relative_url']
+            ),
             name=repo['_href'],
             repositoryid=repo['id']
         )
@@ -1643,10 +1654,14 @@ class PackageManagerModuleListTestCase(unittest.TestCase):
         lines = cli_client.run((
             ('dnf', 'module', 'list', '--all')
         ), sudo=True).stdout.splitlines()
+        modules = {key: [] for key in MODULE_FIXTURES_PACKAGES}
+        for line in lines:
+            for key, module in modules.items():
+                if key in line:
+                    module.append(line)
         for key, value in MODULE_FIXTURES_PACKAGES.items():
             with self.subTest(package=key):
-                module = [line for line in lines if key in line]
-                self.assertEqual(len(module), value, module)
+                self.assertEqual(len(modules[key]), value, modules[key])
 
 
 class UploadModuleTestCase(unittest.TestCase):
@@ -1668,7 +1683,6 @@ class UploadModuleTestCase(unittest.TestCase):
             distributors=[gen_distributor()]
         )
         repo = self.client.post(REPOSITORY_PATH, body)
-        repo = self.client.get(repo['_href'], params={'details': True})
         self.addCleanup(self.client.delete, repo['_href'])
         sync_repo(self.cfg, repo)
 
@@ -1696,18 +1710,14 @@ class UploadModuleTestCase(unittest.TestCase):
             distributors=[gen_distributor()]
         )
         repo = self.client.post(REPOSITORY_PATH, body)
-        repo = self.client.get(repo['_href'], params={'details': True})
         self.addCleanup(self.client.delete, repo['_href'])
         sync_repo(self.cfg, repo)
 
         # Modify Modules.yaml and upload
+        old = 'stream: {}'.format(MODULE_FIXTURES_PACKAGE_STREAM['stream'])
+        new = 'stream: {}'.format(MODULE_FIXTURES_PACKAGE_STREAM['new_stream'])
         unit = self._get_module_yaml_file(RPM_WITH_MODULES_FEED_URL)
-        unit_string = unit.decode('utf-8')
-        unit_string = unit_string.replace(
-            'stream: {}'.format(MODULE_FIXTURES_PACKAGE_STREAM['stream']),
-            'stream: {}'.format(MODULE_FIXTURES_PACKAGE_STREAM['new_stream'])
-        )
-        unit = unit_string.encode()
+        unit = unit.replace(old.encode(), new.encode())
         upload_import_unit(self.cfg, unit, {
             'unit_key': {},
             'unit_type_id': 'modulemd',
@@ -1728,8 +1738,9 @@ class UploadModuleTestCase(unittest.TestCase):
         form ``repodata/[…]-modules.yaml.gz``.
         """
         repo_path = urljoin(path, 'repodata/repomd.xml')
-        response = utils.http_get(repo_path)
-        root_elem = ElementTree.fromstring(response)
+        response = _FIXTURES_SESSION.get(repo_path, stream=True)
+        response.raise_for_status()
+        response.raw.decode_content = True
 
         # <ns0:repomd xmlns:ns0="http://linux.duke.edu/metadata/repo">
         #     <ns0:data type="modules">
@@ -1739,15 +1750,22 @@ class UploadModuleTestCase(unittest.TestCase):
         #     </ns0:data>
         #     …
 
-        xpath = '{{{}}}data'.format(RPM_NAMESPACES['metadata/repo'])
-        data_elements = [
-            elem for elem in root_elem.findall(xpath)
-            if elem.get('type') == 'modules'
-        ]
-        xpath = '{{{}}}location'.format(RPM_NAMESPACES['metadata/repo'])
-        relative_path = data_elements[0].find(xpath).get('href')
-        unit = utils.http_get(urljoin(path, relative_path))
-        with io.BytesIO(unit) as compressed:
-            with gzip.GzipFile(fileobj=compressed) as decompressed:
-                unit = decompressed.read()
-        return unit
+        with response:
+            for _, elem in ElementTree.iterparse(response.raw):
+                if elem.tag != _REPOMD_DATA_TAG:
+                    continue
+                if elem.get('type') == 'modules':
+                    relative_path = elem.find(_REPOMD_LOCATION_TAG).get('href')
+                    break
+                elem.clear()
+            else:
+                raise Exception('{} has no modules data.'.format(repo_path))
+        response = _FIXTURES_SESSION.get(
+            urljoin(path, relative_path),
+            stream=True
+        )
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with response:
+            with gzip.GzipFile(fileobj=response.raw) as decompressed:
+                return decompressed.read()
@@ -1,6 +1,7 @@
 # coding=utf-8
 """Test actions over repositories with rich and weak dependencies."""
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 
 import pytest
@@ -34,11 +35,47 @@ class SyncPublishTestCase(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        """Create class-wide variables."""
+        """Sync and publish one repository per feed.
+
+        For each feed, the repository details are fetched after the sync and
+        after the publish, and are stored in ``repos``, keyed by feed.
+        """
         cls.cfg = config.get_config()
         if cls.cfg.pulp_version < Version('2.17'):
             raise unittest.SkipTest('This test requires Pulp 2.17 or newer.')
         cls.client = api.Client(cls.cfg, api.json_handler)
+        cls.hrefs = []
+        cls.repos = {}
+        try:
+            for feed in (RPM_RICH_WEAK_FEED_URL, SRPM_RICH_WEAK_FEED_URL):
+                cls.repos[feed] = cls._prepare(feed)
+        except:  # noqa:E722
+            cls.tearDownClass()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        """Delete the repositories created by :meth:`setUpClass`."""
+        for href in cls.hrefs:
+            cls.client.delete(href)
+
+    @classmethod
+    def _prepare(cls, feed):
+        """Create, sync and publish a repository with the given feed.
+
+        Return the repository details after the sync and after the publish.
+        """
+        body = gen_repo(
+            importer_config={'feed': feed},
+            distributors=[gen_distributor()]
+        )
+        repo = cls.client.post(REPOSITORY_PATH, body)
+        cls.hrefs.append(repo['_href'])
+        sync_repo(cls.cfg, repo)
+        synced = cls.client.get(repo['_href'], params={'details': True})
+        publish_repo(cls.cfg, synced)
+        published = cls.client.get(repo['_href'], params={'details': True})
+        return synced, published
 
     def test_rpm(self):
         """Sync and publish an RPM repo. See :meth:`do_test`."""
@@ -49,26 +86,21 @@ class SyncPublishTestCase(unittest.TestCase):
         self.do_test(SRPM_RICH_WEAK_FEED_URL)
 
     def do_test(self, feed):
-        """Sync and publish a repository with rich and weak dependencies.
+        """Check the ``last_publish`` of a rich/weak repository's distributor.
+
+        The repository with the given feed was synced and published by
+        :meth:`setUpClass`. Verify that its distributor had not published after
+        the sync, and had published after the publish.
 
         This test targets the following issue:
 
         `Pulp Smash #901 <https://github.com/PulpQE/pulp-smash/issues/901>`_.
         """
-        body = gen_repo(
-            importer_config={'feed': feed},
-            distributors=[gen_distributor()]
-        )
-        repo = self.client.post(REPOSITORY_PATH, body)
-        self.addCleanup(self.client.delete, repo['_href'])
-        sync_repo(self.cfg, repo)
-        repo = self.client.get(repo['_href'], params={'details': True})
+        synced, published = self.repos[feed]
         with self.subTest(comment='verify last_publish after sync'):
-            self.assertIsNone(repo['distributors'][0]['last_publish'])
-        publish_repo(self.cfg, repo)
-        repo = self.client.get(repo['_href'], params={'details': True})
+            self.assertIsNone(synced['distributors'][0]['last_publish'])
         with self.subTest(comment='verify last_publish after publish'):
-            self.assertIsNotNone(repo['distributors'][0]['last_publish'])
+            self.assertIsNotNone(published['distributors'][0]['last_publish'])
 
 
 class UploadRPMTestCase(unittest.TestCase):
@@ -125,10 +157,10 @@ class PackageManagerConsumeRPMTestCase(unittest.TestCase):
         publish_repo(cfg, repo)
         repo_path = gen_yum_config_file(
             cfg,
-            baseurl=urljoin(cfg.get_base_url(), urljoin(
-                'pulp/repos/',
-                repo['distributors'][0]['config']['relative_url']
-            )),
+            baseurl=urljoin(
+                cfg.get_base_url(),
+                'pulp/repos/' + repo['distributors'][0]['config']['relative_url']
+            ),
             name=repo['_href'],
             repositoryid=repo['id']
         )
@@ -210,10 +242,7 @@ class CopyRecursiveUnitsTestCase(unittest.TestCase):
         See :meth:`do_test`."
         """
         repo = self.do_test(True, False)
-        dst_unit_ids = [
-            unit['metadata']['name'] for unit in
-            search_units(self.cfg, repo, {'type_ids': ['rpm']})
-        ]
+        dst_unit_ids = self.get_rpm_names(repo)
         self.assertEqual(
             len(dst_unit_ids),
             RPM2_RICH_WEAK_DATA['total_installed_packages'],
@@ -228,10 +257,7 @@ class CopyRecursiveUnitsTestCase(unittest.TestCase):
         if self.cfg.pulp_version < Version('2.18.1'):
             raise unittest.SkipTest('This test requires Pulp 2.18.1 or newer.')
         repo = self.do_test(True, True)
-        dst_unit_ids = [
-            unit['metadata']['name'] for unit in
-            search_units(self.cfg, repo, {'type_ids': ['rpm']})
-        ]
+        dst_unit_ids = self.get_rpm_names(repo)
         self.assertEqual(
             len(dst_unit_ids),
             RPM2_RICH_WEAK_DATA['total_installed_packages'],
@@ -244,24 +270,41 @@ class CopyRecursiveUnitsTestCase(unittest.TestCase):
         See :meth:`do_test`."
         """
         repo = self.do_test(False, False)
-        dst_unit_ids = [
-            unit['metadata']['name'] for unit in
-            search_units(self.cfg, repo, {'type_ids': ['rpm']})
-        ]
+        dst_unit_ids = self.get_rpm_names(repo)
         self.assertEqual(len(dst_unit_ids), 1, dst_unit_ids)
 
+    def get_rpm_names(self, repo):
+        """Return the names of the RPMs in the given repository."""
+        return [
+            unit['metadata']['name'] for unit in search_units(
+                self.cfg,
+                repo,
+                {'type_ids': ['rpm'], 'fields': {'unit': ['name']}}
+            )
+        ]
+
+    def delete_repos(self, repos):
+        """Delete the given repositories concurrently."""
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(
+                self.client.delete,
+                [repo['_href'] for repo in repos]
+            ))
+
     def do_test(self, recursive, recursive_conservative):
         """Copy of units for a repository with rich/weak dependencies."""
         repos = []
+        self.addCleanup(self.delete_repos, repos)
         body = gen_repo(
             importer_config={'feed': RPM_RICH_WEAK_FEED_URL},
             distributors=[gen_distributor()]
         )
         repos.append(self.client.post(REPOSITORY_PATH, body))
-        self.addCleanup(self.client.delete, repos[0]['_href'])
-        sync_repo(self.cfg, repos[0])
-        repos.append(self.client.post(REPOSITORY_PATH, gen_repo()))
-        self.addCleanup(self.client.delete, repos[1]['_href'])
+        # Create the target repository while the source one is syncing.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            sync = executor.submit(sync_repo, self.cfg, repos[0])
+            repos.append(self.client.post(REPOSITORY_PATH, gen_repo()))
+            sync.result()
 
         # Pulp 2.18.1 introduced a new flag `recursive_conservative`.
         # If true, units are copied together with their
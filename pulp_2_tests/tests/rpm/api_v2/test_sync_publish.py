@@ -9,10 +9,11 @@ For information on repository sync and publish operations, see
 .. _Synchronization:
     http://docs.pulpproject.org/en/latest/dev-guide/integration/rest-api/repo/sync.html
 """
+import hashlib
 import inspect
 import os
 import unittest
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 
 from packaging.version import Version
@@ -63,6 +64,9 @@ from pulp_2_tests.tests.rpm.utils import (
 )
 from pulp_2_tests.tests.rpm.utils import set_up_module as setUpModule  # pylint:disable=unused-import
 
+_REPOMD_CHECKSUM_XPATH = '{{{namespace}}}data/{{{namespace}}}checksum'.format(
+    namespace=RPM_NAMESPACES['metadata/repo']
+)
 
 # This class is left public for documentation purposes.
 class SyncRepoBaseTestCase(unittest.TestCase):
@@ -82,7 +86,11 @@ class SyncRepoBaseTestCase(unittest.TestCase):
         body = gen_repo()
         body['importer_config']['feed'] = cls.get_feed_url()
         cls.repo = cls.client.post(REPOSITORY_PATH, body)
-        cls.report = sync_repo(cls.cfg, cls.repo)
+        try:
+            cls.report = sync_repo(cls.cfg, cls.repo)
+        except:  # noqa:E722
+            cls.tearDownClass()
+            raise
 
     @classmethod
     def tearDownClass(cls):
@@ -108,7 +116,7 @@ class SyncRepoBaseTestCase(unittest.TestCase):
         client's response handler. (For more information, see the source of
         ``pulp_smash.api.safe_handler``.)
         """
-        tasks = tuple(api.poll_spawned_tasks(self.cfg, self.report.json()))
+        tasks = api.poll_spawned_tasks(self.cfg, self.report.json())
         for i, task in enumerate(tasks):
             with self.subTest(i=i):
                 error_details = task['progress_report']['yum_importer']['content']['error_details']  # pylint:disable=line-too-long
@@ -140,7 +148,7 @@ class SyncRpmRepoTestCase(SyncRepoBaseTestCase):
         # langpack support was added in 2.9
         if self.cfg.pulp_version >= Version('2.9'):
             content_unit_counts['package_langpacks'] = 1
-        repo = api.Client(self.cfg).get(self.repo['_href']).json()
+        repo = self.client.get(self.repo['_href'])
         self.assertEqual(repo['content_unit_counts'], content_unit_counts)
 
     def test_no_change_in_second_sync(self):
@@ -184,48 +192,57 @@ class SyncInvalidMetadataTestCase(unittest.TestCase):
     <https://pulp.plan.io/issues/1287>`_.
     """
 
+    @classmethod
+    def setUpClass(cls):
+        """Create class-wide variables."""
+        cls.cfg = config.get_config()
+        cls.client = api.Client(cls.cfg, api.json_handler)
+
     @classmethod
     def tearDownClass(cls):
         """Delete orphan content units."""
-        api.Client(config.get_config()).delete(ORPHANS_PATH)
-
-    def test_incomplete_filelists(self):
-        """Sync a repository with an incomplete ``filelists.xml`` file."""
-        self.do_test(RPM_INCOMPLETE_FILELISTS_FEED_URL)
-
-    def test_incomplete_other(self):
-        """Sync a repository with an incomplete ``other.xml`` file."""
-        self.do_test(RPM_INCOMPLETE_OTHER_FEED_URL)
-
-    def test_missing_filelists(self):
-        """Sync a repository that's missing its ``filelists.xml`` file."""
-        self.do_test(RPM_MISSING_FILELISTS_FEED_URL)
+        cls.client.delete(ORPHANS_PATH)
 
-    def test_missing_other(self):
-        """Sync a repository that's missing its ``other.xml`` file."""
-        self.do_test(RPM_MISSING_OTHER_FEED_URL)
+    def test_all(self):
+        """Sync repositories with invalid metadata.
 
-    def test_missing_primary(self):
-        """Sync a repository that's missing its ``primary.xml`` file."""
-        self.do_test(RPM_MISSING_PRIMARY_FEED_URL)
+        Sync a repository for each of the following feeds, in parallel, and
+        verify that each sync fails before its content is processed:
 
-    def do_test(self, feed_url):
-        """Implement the logic described by each of the ``test*`` methods."""
-        cfg = config.get_config()
-        client = api.Client(cfg)
-        body = gen_repo()
-        body['importer_config']['feed'] = feed_url
-        repo = client.post(REPOSITORY_PATH, body).json()
-        self.addCleanup(client.delete, repo['_href'])
-
-        with self.assertRaises(exceptions.TaskReportError) as context:
-            sync_repo(cfg, repo)
-        task = context.exception.task
-        self.assertEqual(
-            'NOT_STARTED',
-            task['progress_report']['yum_importer']['content']['state'],
-            task,
+        * A repository with an incomplete ``filelists.xml`` file.
+        * A repository with an incomplete ``other.xml`` file.
+        * A repository that's missing its ``filelists.xml`` file.
+        * A repository that's missing its ``other.xml`` file.
+        * A repository that's missing its ``primary.xml`` file.
+        """
+        feed_urls = (
+            RPM_INCOMPLETE_FILELISTS_FEED_URL,
+            RPM_INCOMPLETE_OTHER_FEED_URL,
+            RPM_MISSING_FILELISTS_FEED_URL,
+            RPM_MISSING_OTHER_FEED_URL,
+            RPM_MISSING_PRIMARY_FEED_URL,
         )
+        repos = []
+        for feed_url in feed_urls:
+            body = gen_repo()
+            body['importer_config']['feed'] = feed_url
+            repos.append(self.client.post(REPOSITORY_PATH, body))
+            self.addCleanup(self.client.delete, repos[-1]['_href'])
+
+        with ThreadPoolExecutor(max_workers=len(repos)) as executor:
+            futures = [
+                executor.submit(sync_repo, self.cfg, repo) for repo in repos
+            ]
+        for feed_url, future in zip(feed_urls, futures):
+            with self.subTest(feed_url=feed_url):
+                with self.assertRaises(exceptions.TaskReportError) as context:
+                    future.result()
+                task = context.exception.task
+                self.assertEqual(
+                    'NOT_STARTED',
+                    task['progress_report']['yum_importer']['content']['state'],
+                    task,
+                )
 
 
 class ChangeFeedTestCase(unittest.TestCase):
@@ -254,13 +271,17 @@ class ChangeFeedTestCase(unittest.TestCase):
         if check_issue_3104(self.cfg):
             self.skipTest('https://pulp.plan.io/issues/3104')
 
-        # Create, sync and publish repositories A and B.
+        # Create repositories A and B, then sync and publish them in parallel.
+        # Meanwhile, download the RPM that will be compared at the end.
         repos = []
         for _ in range(2):
             body = gen_repo()
             body['importer_config']['feed'] = RPM_UNSIGNED_FEED_URL
             body['distributors'] = [gen_distributor()]
-            repos.append(self.create_sync_publish_repo(body))
+            repos.append(self.create_repo(body))
+        with ThreadPoolExecutor(max_workers=len(repos) + 1) as executor:
+            rpm = executor.submit(utils.http_get, RPM_UNSIGNED_URL)
+            list(executor.map(self.sync_publish_repo, repos))
 
         # Create repository C, let it sync from repository A, and publish it.
         body = gen_repo()
@@ -281,7 +302,7 @@ class ChangeFeedTestCase(unittest.TestCase):
         sync_repo(self.cfg, repo)
         publish_repo(self.cfg, repo)
 
-        rpm = utils.http_get(RPM_UNSIGNED_URL)
+        rpm = rpm.result()
         response = get_unit(self.cfg, repo['distributors'][0], RPM)
         with self.subTest():
             self.assertIn(
@@ -289,27 +310,47 @@ class ChangeFeedTestCase(unittest.TestCase):
                 ('application/octet-stream', 'application/x-rpm')
             )
         with self.subTest():
-            self.assertEqual(rpm, response.content)
+            self.assertEqual(
+                hashlib.sha256(rpm).hexdigest(),
+                hashlib.sha256(response.content).hexdigest()
+            )
 
     def create_sync_publish_repo(self, body):
         """Create, sync and publish a repository.
 
         Also, schedule the repository for deletion.
 
+        :param body: A dict of information to use when creating the repository.
+        :return: A detailed dict of information about the repository.
+        """
+        repo = self.create_repo(body)
+        self.sync_publish_repo(repo)
+        return repo
+
+    def create_repo(self, body):
+        """Create a repository and schedule it for deletion.
+
         :param body: A dict of information to use when creating the repository.
         :return: A detailed dict of information about the repository.
         """
         repo = self.client.post(REPOSITORY_PATH, body)
         self.addCleanup(self.client.delete, repo['_href'])
-        repo = self.client.get(repo['_href'], params={'details': True})
+        return self.client.get(repo['_href'], params={'details': True})
+
+    def sync_publish_repo(self, repo):
+        """Sync and publish a repository.
+
+        :param repo: A detailed dict of information about the repository.
+        """
         sync_repo(self.cfg, repo)
         publish_repo(self.cfg, repo)
-        return repo
 
     def get_feed(self, repo):
         """Build the feed to an RPM repository's distributor."""
-        feed = urljoin(self.cfg.get_base_url(), 'pulp/repos/')
-        return urljoin(feed, repo['distributors'][0]['config']['relative_url'])
+        return urljoin(
+            self.cfg.get_base_url(),
+            'pulp/repos/' + repo['distributors'][0]['config']['relative_url']
+        )
 
 
 class SyncInParallelTestCase(unittest.TestCase):
@@ -334,48 +375,28 @@ class SyncInParallelTestCase(unittest.TestCase):
         """
         cfg = config.get_config()
         client = api.Client(cfg, api.json_handler)
-        repos = []  # append() is thread-safe
 
         def create_repo():
             """Create a repository and schedule its deletion.
 
-            Append a dict of information about the repository to ``repos``.
+            :returns: A dict of information about the repository.
             """
             body = gen_repo()
             body['importer_config']['feed'] = RPM_UNSIGNED_FEED_URL
             repo = client.post(REPOSITORY_PATH, body)
             self.addCleanup(client.delete, repo['_href'])
-            repos.append(repo)
-
-        def get_repo(repo):
-            """Get information about a repository. Append it to ``repos``.
-
-            :param repo: A dict of information about a repository.
-            """
-            repos.append(client.get(repo['_href']))
-
-        threads = tuple(Thread(target=create_repo) for _ in range(5))
-        for thread in threads:
-            thread.start()
-        for thread in threads:
-            thread.join()
-
-        threads = tuple(
-            Thread(target=sync_repo, args=(cfg, repo)) for repo in repos
-        )
-        for thread in threads:
-            thread.start()
-        for thread in threads:
-            thread.join()
-
-        threads = tuple(
-            Thread(target=get_repo, args=(repo,)) for repo in repos
-        )
-        repos.clear()
-        for thread in threads:
-            thread.start()
-        for thread in threads:
-            thread.join()
+            return repo
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(create_repo) for _ in range(5)]
+            repos = [future.result() for future in futures]
+            futures = [executor.submit(sync_repo, cfg, repo) for repo in repos]
+            for future in futures:
+                future.result()
+            repos = list(executor.map(
+                client.get,
+                [repo['_href'] for repo in repos]
+            ))
         for repo in repos:
             with self.subTest():
                 self.assertEqual(
@@ -387,6 +408,12 @@ class SyncInParallelTestCase(unittest.TestCase):
 class ErrorReportTestCase(unittest.TestCase):
     """Test whether an error report contains sufficient information."""
 
+    @classmethod
+    def setUpClass(cls):
+        """Create class-wide variables."""
+        cls.cfg = config.get_config()
+        cls.client = api.Client(cls.cfg, api.json_handler)
+
     def test_invalid_feed_error_message(self):
         """Test whether an error report contains sufficient information.
 
@@ -406,17 +433,10 @@ class ErrorReportTestCase(unittest.TestCase):
         """
         task = self.run_task(gen_repo(importer_config={'feed': utils.uuid4()}))
 
-        with self.subTest(comment='check task error description'):
-            tokens = ['scheme', 'must', 'be', 'http', 'https', 'file']
-            self.assertTrue(
-                all(
-                    [
-                        token
-                        in task['error']['description'].lower()
-                        for token in tokens
-                    ]
-                )
-            )
+        self.check_error_description(
+            task,
+            ('scheme', 'must', 'be', 'http', 'https', 'file')
+        )
 
     def test_missing_filelists_error_message(self):
         """Test whether an error report contains sufficient information.
@@ -432,8 +452,7 @@ class ErrorReportTestCase(unittest.TestCase):
 
         .. _Pulp #4262: https://pulp.plan.io/issues/4262
         """
-        cfg = config.get_config()
-        if cfg.pulp_version < Version('2.19'):
+        if self.cfg.pulp_version < Version('2.19'):
             raise unittest.SkipTest('This test requires Pulp 2.19 or newer.')
 
         repo_body = gen_repo(
@@ -441,28 +460,29 @@ class ErrorReportTestCase(unittest.TestCase):
         )
         task = self.run_task(repo_body)
 
+        self.check_error_description(
+            task,
+            ('error', 'metadata', 'not', 'found')
+        )
+
+    def check_error_description(self, task, tokens):
+        """Assert the task's error description contains all ``tokens``."""
         with self.subTest(comment='check task error description'):
-            tokens = ['error', 'metadata', 'not', 'found']
+            description = task['error']['description']
+            lowered = description.lower()
             self.assertTrue(
-                all(
-                    [
-                        token
-                        in task['error']['description'].lower()
-                        for token in tokens
-                    ]
-                )
+                all(token in lowered for token in tokens),
+                description
             )
 
     def run_task(self, repo_body):
         """Implement the logic described by each of the ``test*`` methods."""
-        cfg = config.get_config()
-        client = api.Client(cfg, api.json_handler)
-        repo = client.post(REPOSITORY_PATH, repo_body)
-        self.addCleanup(client.delete, repo['_href'])
-        repo = client.get(repo['_href'], params={'details': True})
+        repo = self.client.post(REPOSITORY_PATH, repo_body)
+        self.addCleanup(self.client.delete, repo['_href'])
+        repo = self.client.get(repo['_href'], params={'details': True})
 
         with self.assertRaises(exceptions.TaskReportError) as context:
-            sync_repo(cfg, repo)
+            sync_repo(self.cfg, repo)
 
         task = context.exception.task
 
@@ -479,10 +499,11 @@ class NonExistentRepoTestCase(unittest.TestCase):
     <https://github.com/PulpQE/pulp-smash/issues/157>`_.
     """
 
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         """Set variables used by each test case."""
-        self.cfg = config.get_config()
-        self.repo = {'_href': urljoin(REPOSITORY_PATH, utils.uuid4())}
+        cls.cfg = config.get_config()
+        cls.repo = {'_href': urljoin(REPOSITORY_PATH, utils.uuid4())}
 
     def test_sync(self):
         """Sync a non-existent repository."""
@@ -526,14 +547,9 @@ class SyncSha512RPMPackageTestCase(unittest.TestCase):
 
         # retrieving the published repo
         xml_element = get_repodata_repomd_xml(cfg, repo['distributors'][0])
-        xpath = (
-            '{{{namespace}}}data/{{{namespace}}}checksum'.format(
-                namespace=RPM_NAMESPACES['metadata/repo']
-            )
-        )
         checksum_type = {
             element.attrib['type']
-            for element in xml_element.findall(xpath)
+            for element in xml_element.iterfind(_REPOMD_CHECKSUM_XPATH)
         }
         self.assertEqual(checksum_type, {'sha512'}, checksum_type)
         self.assertEqual(
@@ -638,6 +654,7 @@ class YumMetadataSymlinkTesCase(unittest.TestCase):
             raise unittest.SkipTest(
                 'This test requires Pulp 2.19.1 or newer.'
             )
+        cls.cli_client = cli.Client(cls.cfg)
 
     def test_broken_simlinks(self):
         """Test broken symlinks."""
@@ -674,12 +691,11 @@ class YumMetadataSymlinkTesCase(unittest.TestCase):
 
     def find_productid(self, verify_simlink, path):
         """Find productid given a path."""
-        cli_client = cli.Client(self.cfg)
         if verify_simlink is True:
             cmd = 'find {} -type l -name *productid*'.format(path)
         else:
             cmd = 'find {} -type f -name *productid*'.format(path)
-        return cli_client.run(
+        return self.cli_client.run(
             cmd.split(),
             sudo=True
         ).stdout.splitlines()
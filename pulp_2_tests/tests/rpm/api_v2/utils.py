@@ -1,7 +1,6 @@
 # coding=utf-8
 """Utility functions for RPM API tests."""
 import gzip
-import io
 import time
 import unittest
 from os.path import basename, join
@@ -140,9 +139,9 @@ def get_xml_content_from_fixture(fixture_path, data_type):
     This function should be called only when the data of type xml is
     required. These ``data_type`` are present in repodata/repomd.xml
     file. The function parses the ``repomd.xml`` file, gathers the
-    location of the data_type object, downloads the file and handles
-    it using the ``xml_handler`` and finally returns
-    ``xml.etree.Element`` of the root node.
+    location of the data_type object, streams the file into the XML
+    parser as it is downloaded and finally returns ``xml.etree.Element``
+    of the root node.
 
     :param fixture_path: Url path containing the fixtures.
     :param data_type: The required xml file content that needs
@@ -165,8 +164,14 @@ def get_xml_content_from_fixture(fixture_path, data_type):
         raise Exception(
             "get_xml_content_from_fixture doesn't support non-xml data."
         )
-    unit = requests.get(urljoin(fixture_path, relative_path))
-    return xml_handler(None, unit)
+    response = requests.get(urljoin(fixture_path, relative_path), stream=True)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    with response:
+        if relative_path.endswith('.gz'):
+            with gzip.GzipFile(fileobj=response.raw) as decompressed:
+                return ElementTree.parse(decompressed).getroot()
+        return ElementTree.parse(response.raw).getroot()
 
 
 def xml_handler(_, response):
@@ -187,9 +192,7 @@ def xml_handler(_, response):
     """
     response.raise_for_status()
     if response.request.url.endswith('.gz'):  # See bug referenced in docstring
-        with io.BytesIO(response.content) as compressed:
-            with gzip.GzipFile(fileobj=compressed) as decompressed:
-                xml_bytes = decompressed.read()
+        xml_bytes = gzip.decompress(response.content)
     else:
         xml_bytes = response.content
     # A well-formed XML document begins with a declaration like this:
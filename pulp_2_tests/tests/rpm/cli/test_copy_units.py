@@ -1,5 +1,6 @@
 # coding=utf-8
 """Tests that copy units from one repository to another."""
+import re
 import subprocess
 import unittest
 from urllib.parse import urljoin
@@ -23,6 +24,20 @@ from pulp_2_tests.tests.rpm.utils import (
 _REPO_ID = utils.uuid4()
 """The ID of the repository created by ``setUpModule``."""
 
+_SOURCE_RPMS = {}
+"""The names and versions of the RPMs in the repository at ``_REPO_ID``.
+
+It maps each RPM name to a list of versions, e.g. ``{'walrus': ['0.71',
+'5.21']}``. It is filled on first use by
+:func:`_get_source_rpm_names_versions` and cleared by ``tearDownModule``.
+"""
+
+# e.g. 'Filename: my-walrus-0.71-1.noarch.rpm' → ('my-walrus', '0.71')
+_FILENAME_PATTERN = re.compile(
+    r'^[ \t]*Filename:[ \t]*(\S+)-([^-\s]+)-[^-\s]+[ \t]*$',
+    re.MULTILINE
+)
+
 
 def setUpModule():  # pylint:disable=invalid-name
     """Possibly skip tests. Create and sync an RPM repository.
@@ -33,7 +48,7 @@ def setUpModule():  # pylint:disable=invalid-name
     """
     set_up_module()
     cfg = config.get_config()
-    client = cli.Client(config.get_config())
+    client = cli.Client(cfg)
 
     # log in, then create repository
     pulp_admin_login(cfg)
@@ -59,6 +74,7 @@ def setUpModule():  # pylint:disable=invalid-name
 
 def tearDownModule():  # pylint:disable=invalid-name
     """Delete the repository created by ``setUpModule``."""
+    _SOURCE_RPMS.clear()
     cli.Client(config.get_config()).run(
         'pulp-admin rpm repo delete --repo-id {}'.format(_REPO_ID).split()
     )
@@ -154,7 +170,7 @@ class CopyRecursiveTestCase(UtilsMixin, unittest.TestCase):
         self.assertEqual(len(dst_rpms['walrus']), 1, dst_rpms)
 
         # Verify the version of the "walrus" unit
-        src_rpms = _get_rpm_names_versions(cfg, _REPO_ID)
+        src_rpms = _get_source_rpm_names_versions(cfg)
         self.assertEqual(src_rpms['walrus'][-1], dst_rpms['walrus'][0])
 
 
@@ -230,10 +246,10 @@ class UpdateRpmTestCase(UtilsMixin, unittest.TestCase):
 
         # Pick an RPM with two versions.
         rpm_name = 'walrus'
-        rpm_versions = _get_rpm_names_versions(cfg, _REPO_ID)[rpm_name]
+        rpm_versions = _get_source_rpm_names_versions(cfg)[rpm_name]
 
         # Copy the older RPM to the second repository, and publish it.
-        self._copy_and_publish(cfg, rpm_name, rpm_versions[0], repo_id)
+        self._copy_and_publish(client, rpm_name, rpm_versions[0], repo_id)
 
         # Install the RPM on a host.
         repo_path = gen_yum_config_file(
@@ -248,21 +264,20 @@ class UpdateRpmTestCase(UtilsMixin, unittest.TestCase):
         client.run(('rpm', '-q', rpm_name))
 
         # Copy the newer RPM to the second repository, and publish it.
-        self._copy_and_publish(cfg, rpm_name, rpm_versions[1], repo_id)
+        self._copy_and_publish(client, rpm_name, rpm_versions[1], repo_id)
 
         # Update the installed RPM on the host.
         proc = pkg_mgr.upgrade(rpm_name)
         self.assertNotIn('Nothing to do.', proc.stdout)
 
-    def _copy_and_publish(self, cfg, rpm_name, rpm_version, repo_id):
+    def _copy_and_publish(self, client, rpm_name, rpm_version, repo_id):
         """Copy an RPM from repository ``_REPO_ID`` to the given repository.
 
+        :param client: A ``pulp_smash.cli.Client`` connected to the Pulp host.
         :param rpm_name: The name of the RPM to copy.
         :param rpm_version: The version of the RPM to copy.
         :param repo_id: The repository to which the RPM is copied.
         """
-        client = cli.Client(cfg)
-
         # Copy the package and its dependencies to the new repo
         proc = client.run((
             'pulp-admin', 'rpm', 'repo', 'copy', 'rpm',
@@ -306,19 +321,23 @@ def _get_rpm_names_versions(cfg, repo_id):
         versions sorted in ascending order. For example: ``{'walrus': ['0.71',
         '5.21']}``.
     """
-    keyword = 'Filename:'
     completed_proc = cli.Client(cfg).run(
         'pulp-admin rpm repo content rpm --repo-id {}'.format(repo_id).split()
     )
     names_versions = {}
-    for line in completed_proc.stdout.splitlines():
-        if keyword not in line:
-            continue
-        # e.g. 'Filename: my-walrus-0.71-1.noarch.rpm ' → ['my-walrus', '0.71']
-        filename_parts = line.lstrip(keyword).strip().split('-')[:-1]
-        name = '-'.join(filename_parts[:-1])
-        version = filename_parts[-1]
+    for name, version in _FILENAME_PATTERN.findall(completed_proc.stdout):
         names_versions.setdefault(name, []).append(version)
     for versions in names_versions.values():
         versions.sort(key=Version)
     return names_versions
+
+
+def _get_source_rpm_names_versions(cfg):
+    """Get the RPM names and versions of the repository named by ``_REPO_ID``.
+
+    Test cases do not change that repository, so the result of
+    :func:`_get_rpm_names_versions` is cached in ``_SOURCE_RPMS``.
+    """
+    if not _SOURCE_RPMS:
+        _SOURCE_RPMS.update(_get_rpm_names_versions(cfg, _REPO_ID))
+    return _SOURCE_RPMS
@@ -1,6 +1,7 @@
 # coding=utf-8
 """Tests that sync RPM repositories."""
 import random
+import re
 import unittest
 
 from packaging.version import Version
@@ -14,9 +15,12 @@ from pulp_2_tests.constants import (
     SRPM_DUPLICATE_FEED_URL,
     SRPM_RICH_WEAK_FEED_URL,
 )
-
+from pulp_2_tests.tests.rpm.cli.utils import sync_repo
 from pulp_2_tests.tests.rpm.utils import check_issue_2620, set_up_module
 
+# e.g. 'Name: my-walrus' → 'my-walrus'
+_NAME_PATTERN = re.compile(r'^[ \t]*Name:[ \t]*(.*?)[ \t]*$', re.MULTILINE)
+
 
 def setUpModule():  # pylint:disable=invalid-name
     """Execute ``pulp-admin login`` and reset Pulp.
@@ -76,8 +80,8 @@ class RemovedContentTestCase(_BaseTestCase):
         self.addCleanup(client.run, (
             'pulp-admin', 'rpm', 'repo', 'delete', '--repo-id', repo_id,
         ))
-        sync_repo(cfg, repo_id)
-        unit_name = random.choice(get_rpm_names(cfg, repo_id))
+        sync_repo(cfg, repo_id, client=client)
+        unit_name = random.choice(get_rpm_names(cfg, repo_id, client=client))
 
         # remove a content unit from the repository
         client.run((
@@ -85,15 +89,15 @@ class RemovedContentTestCase(_BaseTestCase):
             '--str-eq', 'name={}'.format(unit_name),
         ))
         with self.subTest(comment='verify the rpm has been removed'):
-            self.assertNotIn(unit_name, get_rpm_names(cfg, repo_id))
+            self.assertNotIn(unit_name, get_rpm_names(cfg, repo_id, client=client))
 
         # add a content unit to the repository
-        proc = sync_repo(cfg, repo_id)
+        proc = sync_repo(cfg, repo_id, client=client)
         for stream in ('stdout', 'stderr'):
             with self.subTest(stream=stream):
                 self.assertNotIn('Invalid properties:', getattr(proc, stream))
         with self.subTest(comment='verify the rpm has been restored'):
-            self.assertIn(unit_name, get_rpm_names(cfg, repo_id))
+            self.assertIn(unit_name, get_rpm_names(cfg, repo_id, client=client))
 
 
 class ForceSyncTestCase(_BaseTestCase):
@@ -118,8 +122,9 @@ class ForceSyncTestCase(_BaseTestCase):
 
     @classmethod
     def setUpClass(cls):
-        """Create class-wide config."""
+        """Create class-wide config and client."""
         cls.cfg = config.get_config()
+        cls.client = cli.Client(cls.cfg)
 
     def test_rpm_content_units(self):
         """Test a forced full sync on Pulp.
@@ -155,7 +160,7 @@ class ForceSyncTestCase(_BaseTestCase):
     def _do_test(self, unit_type, feed):
         """Test whether one can force Pulp to perform a full sync."""
         # Create and sync a repository.
-        client = cli.Client(self.cfg)
+        client = self.client
         repo_id = utils.uuid4()
         client.run((
             'pulp-admin', 'rpm', 'repo', 'create', '--repo-id', repo_id,
@@ -164,26 +169,26 @@ class ForceSyncTestCase(_BaseTestCase):
         self.addCleanup(client.run, (
             'pulp-admin', 'rpm', 'repo', 'delete', '--repo-id', repo_id,
         ))
-        sync_repo(self.cfg, repo_id)
+        sync_repo(self.cfg, repo_id, client=client)
 
         # Delete a random unit from the filesystem.
-        units = list_units(self.cfg, unit_type)
+        units = list_units(self.cfg, unit_type, client=client)
         unit = random.choice(units)
         cmd = []
         cmd.extend(('rm', '-rf', unit))
         client.run(cmd, sudo=True)
         with self.subTest(comment='verify the unit has been removed'):
-            self.assertEqual(len(list_units(self.cfg, unit_type)), len(units) - 1, unit)
+            self.assertEqual(count_units(self.cfg, unit_type, client=client), len(units) - 1, unit)
 
         # Sync the repository without --force-full.
-        sync_repo(self.cfg, repo_id)
+        sync_repo(self.cfg, repo_id, client=client)
         with self.subTest(comment='verify the unit has not yet been restored'):
-            self.assertEqual(len(list_units(self.cfg, unit_type)), len(units) - 1, unit)
+            self.assertEqual(count_units(self.cfg, unit_type, client=client), len(units) - 1, unit)
 
         # Sync the repository with --force-full.
-        sync_repo(self.cfg, repo_id, force_sync=True)
+        sync_repo(self.cfg, repo_id, force_sync=True, client=client)
         with self.subTest(comment='verify the unit has been restored'):
-            self.assertEqual(len(list_units(self.cfg, unit_type)), len(units), unit)
+            self.assertEqual(count_units(self.cfg, unit_type, client=client), len(units), unit)
 
 
 class ForceSyncDuplicateSRPMFailure(unittest.TestCase):
@@ -214,14 +219,15 @@ class ForceSyncDuplicateSRPMFailure(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        """Create class-wide config."""
+        """Create class-wide config and client."""
         cls.cfg = config.get_config()
         if cls.cfg.pulp_version < Version('2.19'):
             raise unittest.SkipTest('This test requires Pulp 2.19 or newer.')
+        cls.client = cli.Client(cls.cfg)
 
     def setUp(self):
         """Delete orphan content units."""
-        cli.Client(config.get_config()).run((
+        self.client.run((
             'pulp-admin', 'orphan', 'remove', '--all'
         ))
 
@@ -236,7 +242,7 @@ class ForceSyncDuplicateSRPMFailure(unittest.TestCase):
     def do_test(self, unit_type, feed):
         """Test whether Pulp can sync with --srpm skip."""
         repo_id = utils.uuid4()
-        client = cli.Client(self.cfg)
+        client = self.client
         client.run((
             'pulp-admin', 'rpm', 'repo', 'create', '--repo-id', repo_id,
             '--feed', feed, '--skip', 'srpm',
@@ -246,33 +252,33 @@ class ForceSyncDuplicateSRPMFailure(unittest.TestCase):
         ))
         # Before sync, ensure no SRPM units
         with self.assertRaises(CalledProcessError):
-            list_units(self.cfg, unit_type)
+            list_units(self.cfg, unit_type, client=client)
 
         # Verify and after sync there are still no SRPM units
-        sync_repo(self.cfg, repo_id)
+        sync_repo(self.cfg, repo_id, client=client)
         with self.assertRaises(CalledProcessError):
-            list_units(self.cfg, unit_type)
+            list_units(self.cfg, unit_type, client=client)
 
 
-def get_rpm_names(cfg, repo_id):
+def get_rpm_names(cfg, repo_id, client=None):
     """Get a list of names of all packages in a repository.
 
     :param cfg: Information about a Pulp
         deployment.
     :param repo_id: A RPM repository ID.
+    :param client: A ``pulp_smash.cli.Client`` to reuse. If ``None``, one is
+        created from ``cfg``.
     :returns: The names of all modules in a repository, as an ``list``.
     """
-    keyword = 'Name:'
-    proc = cli.Client(cfg).run((
+    if client is None:
+        client = cli.Client(cfg)
+    proc = client.run((
         'pulp-admin', 'rpm', 'repo', 'content', 'rpm', '--repo-id', repo_id
     ))
-    return [
-        line.split(keyword)[1].strip() for line in proc.stdout.splitlines()
-        if keyword in line
-    ]
+    return _NAME_PATTERN.findall(proc.stdout)
 
 
-def list_units(cfg, unit_type):
+def list_units(cfg, unit_type, client=None):
     """Return a list of units in ``/var/lib/pulp/content/units/``.
 
     The unit type can be a number of different types.
@@ -286,27 +292,31 @@ def list_units(cfg, unit_type):
     * modulemd_defaults
 
     This method should be extensible to take any ``unit_type`` and
-    operate as required.
+    operate as required. If ``client`` is ``None``, a
+    ``pulp_smash.cli.Client`` is created from ``cfg``.
+    """
+    if client is None:
+        client = cli.Client(cfg)
+    return client.run(_find_units_cmd(unit_type)).stdout.splitlines()
+
+
+def count_units(cfg, unit_type, client=None):
+    """Return the number of units in ``/var/lib/pulp/content/units/``.
+
+    This is equivalent to ``len(list_units(cfg, unit_type, client))``, except
+    that ``find`` prints one byte per unit instead of its path.
     """
-    return cli.Client(cfg).run((
+    if client is None:
+        client = cli.Client(cfg)
+    return len(client.run(_find_units_cmd(unit_type) + ('-printf', '.')).stdout)
+
+
+def _find_units_cmd(unit_type):
+    """Return a ``find`` command matching the files of the given unit type."""
+    return (
         'find',
         '/var/lib/pulp/content/units/{}'.format(unit_type[0]),
         '-type',
         'f',
         '-name', '*.{}'.format(unit_type[1])
-    )).stdout.splitlines()
-
-
-def sync_repo(cfg, repo_id, force_sync=False):
-    """Sync an RPM repository.
-
-    :param cfg: Information about a Pulp
-        deployment.
-    :param repo_id: A RPM repository ID.
-    :param repo_id: A boolean flag to denote if is a force-full sync.
-    :returns: A ``pulp_smash.cli.CompletedProcess``.
-    """
-    cmd = ['pulp-admin', 'rpm', 'repo', 'sync', 'run', '--repo-id', repo_id]
-    if force_sync:
-        cmd.append('--force-full')
-    return cli.Client(cfg).run(cmd)
+    )
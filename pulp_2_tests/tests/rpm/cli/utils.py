@@ -1,7 +1,15 @@
 # coding=utf-8
 """Utility functions for RPM CLI tests."""
+import re
+
 from pulp_smash import cli
 
+# e.g. '  Package Langpacks: 1' → '1'
+_LANGPACKS_PATTERN = re.compile(
+    r'^[ \t]*Package Langpacks:[ \t]*(\d+)[ \t]*$',
+    re.MULTILINE
+)
+
 
 def count_langpacks(cfg, repo_id):
     """Tell how many langpack content units are in the given repository.
@@ -13,17 +21,33 @@ def count_langpacks(cfg, repo_id):
     """
     # This function could be refactored to take a third "keyword" argument. But
     # what do we do about the "rpm" word in the command below?
-    keyword = 'Package Langpacks:'
     completed_proc = cli.Client(cfg).run(
         'pulp-admin rpm repo list --repo-id {} --fields content_unit_counts'
         .format(repo_id).split()
     )
-    lines = [
-        line for line in completed_proc.stdout.splitlines() if keyword in line
-    ]
+    counts = _LANGPACKS_PATTERN.findall(completed_proc.stdout)
     # A "Package Langpacks: n" line is printed only if at least one unit of
     # that kind is present.
-    assert len(lines) in (0, 1)
-    if lines:
-        return int(lines[0].split(keyword)[1].strip())
+    assert len(counts) in (0, 1)
+    if counts:
+        return int(counts[0])
     return 0
+
+
+def sync_repo(cfg, repo_id, force_sync=False, client=None):
+    """Sync an RPM repository.
+
+    :param cfg: Information about a Pulp
+        deployment.
+    :param repo_id: A RPM repository ID.
+    :param force_sync: A boolean flag to denote if is a force-full sync.
+    :param client: A ``pulp_smash.cli.Client`` to reuse. If ``None``, one is
+        created from ``cfg``.
+    :returns: A ``pulp_smash.cli.CompletedProcess``.
+    """
+    if client is None:
+        client = cli.Client(cfg)
+    cmd = ['pulp-admin', 'rpm', 'repo', 'sync', 'run', '--repo-id', repo_id]
+    if force_sync:
+        cmd.append('--force-full')
+    return client.run(cmd)
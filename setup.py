@@ -37,6 +37,7 @@ setup(
         'Programming Language :: Python :: 3.7',
     ],
     packages=find_packages(include=['pulp_2_tests', 'pulp_2_tests.*']),
+    python_requires='>=3.6',
     install_requires=[
         'jsonschema',
         'packaging',